@@ -1,16 +1,53 @@
 # procurement_to_excel_workers_final.py
+import asyncio
 import json
 import time
 from datetime import datetime, timedelta
+from itertools import chain
+from operator import itemgetter
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
 from tqdm import tqdm
 
+try:
+    from pyexcelerate import Workbook as PyxWorkbook, Style as PyxStyle
+except ImportError:
+    PyxWorkbook = None
+
+try:
+    import xlsxwriter
+except ImportError:  # fall back to openpyxl's streaming (write-only) workbook
+    xlsxwriter = None
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+try:
+    import aiohttp
+except ImportError:  # fetch with the thread pool instead
+    aiohttp = None
+
+try:
+    import ijson
+except ImportError:  # always parse whole response bodies
+    ijson = None
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()  # already compact
+
+except ImportError:  # stdlib json fallback
+    _loads = json.loads
+
+    def _dumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
 # === Configuration ===
 BASE_URL = "http://localhost:8080/procurement/"
 START_DATE = datetime(2022, 8, 1, 0, 0, 0)
@@ -21,6 +58,9 @@ PRICE_CAP = 10.0
 TIMEOUT = 30
 MAX_RETRIES = 3
 MAX_WORKERS = 8
+MAX_CONCURRENCY = 64  # in-flight requests when fetching with aiohttp
+RETRY_STATUSES = (500, 502, 503, 504)
+STREAM_PARSE_MIN_BYTES = 16 * 1024  # smaller bodies are parsed in one go
 PER_CALL_DELAY_SECONDS = 0.0  # if your API needs pacing, set small >0
 
 # Single output file (stable name)
@@ -34,11 +74,13 @@ def make_session() -> requests.Session:
     retries = Retry(
         total=MAX_RETRIES,
         backoff_factor=0.3,
-        status_forcelist=[500, 502, 503, 504],
+        status_forcelist=list(RETRY_STATUSES),
         allowed_methods=frozenset(["GET"]),
     )
     adapter = HTTPAdapter(
-        max_retries=retries, pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS
+        max_retries=retries,
+        pool_connections=MAX_WORKERS * 2,
+        pool_maxsize=MAX_WORKERS * 2,
     )
     s = requests.Session()
     s.mount("http://", adapter)
@@ -46,8 +88,12 @@ def make_session() -> requests.Session:
     return s
 
 
+# Shared by all worker threads so connections are kept alive and reused
+SESSION = make_session()
+
+
 def flatten_record(data: dict, ts_str: str) -> dict:
-    rec = dict(data)
+    rec = data  # freshly parsed per response, safe to flatten in place
     rec["Timestamp"] = ts_str
 
     iex = rec.pop("IEX_Data", {}) or {}
@@ -57,24 +103,35 @@ def flatten_record(data: dict, ts_str: str) -> dict:
     for k in ("Must_Run", "Remaining_Plants"):
         if k in rec and isinstance(rec[k], (list, dict)):
             try:
-                rec[k] = json.dumps(rec[k], separators=(",", ":"))
+                rec[k] = _dumps(rec[k])
             except Exception:
                 rec[k] = str(rec[k])
     return rec
 
 
-def fetch_one(ts: datetime):
+def _stream_parse(headers) -> bool:
+    """Parse incrementally unless the body is known to be small."""
+    if ijson is None:
+        return False
+    length = headers.get("Content-Length")
+    return length is None or int(length) >= STREAM_PARSE_MIN_BYTES
+
+
+def fetch_one(ts_str: str):
     """Return (ts_str, flat_or_None, err_or_None)."""
-    session = make_session()
-    ts_str = ts.strftime("%Y-%m-%d %H:%M:%S")
     try:
-        resp = session.get(
+        with SESSION.get(
             BASE_URL,
             params={"start_date": ts_str, "price_cap": PRICE_CAP},
             timeout=TIMEOUT,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+            stream=True,
+        ) as resp:
+            resp.raise_for_status()
+            if _stream_parse(resp.headers):
+                resp.raw.decode_content = True
+                data = dict(ijson.kvitems(resp.raw, "", use_float=True))
+            else:
+                data = _loads(resp.content)  # skips requests' charset detection
         flat = flatten_record(data, ts_str)
         if PER_CALL_DELAY_SECONDS > 0:
             time.sleep(PER_CALL_DELAY_SECONDS)
@@ -83,14 +140,96 @@ def fetch_one(ts: datetime):
         return ts_str, None, str(e)
 
 
-def build_ts_list(start: datetime, end: datetime, step: timedelta):
+_RETRY = object()  # sentinel: retryable HTTP status, try again after backoff
+
+
+async def _get_async(session, params: dict, retry: bool):
+    # Timeout covers this one request only, not time spent queued for a slot
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+    async with session.get(BASE_URL, params=params, timeout=timeout) as resp:
+        if resp.status in RETRY_STATUSES and retry:
+            return _RETRY
+        resp.raise_for_status()
+        if _stream_parse(resp.headers):
+            return {
+                k: v async for k, v in ijson.kvitems(resp.content, "", use_float=True)
+            }
+        return _loads(await resp.read())
+
+
+async def fetch_one_async(session, sem: asyncio.Semaphore, ts_str: str):
+    """Async twin of fetch_one; retries with backoff like make_session's Retry."""
+    params = {"start_date": ts_str, "price_cap": str(PRICE_CAP)}
+    for attempt in range(MAX_RETRIES + 1):
+        retry = attempt < MAX_RETRIES
+        try:
+            async with sem:
+                data = await _get_async(session, params, retry)
+            if data is _RETRY:
+                await asyncio.sleep(0.3 * 2**attempt)
+                continue
+            flat = flatten_record(data, ts_str)
+            if PER_CALL_DELAY_SECONDS > 0:
+                await asyncio.sleep(PER_CALL_DELAY_SECONDS)
+            return ts_str, flat, None
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if retry:
+                await asyncio.sleep(0.3 * 2**attempt)
+                continue
+            return ts_str, None, str(e) or type(e).__name__
+        except Exception as e:
+            return ts_str, None, str(e)
+
+
+def build_ts_list(start: datetime, end: datetime, step: timedelta) -> list[str]:
+    """Return the request timestamps, already formatted as 'YYYY-MM-DD HH:MM:SS'."""
+    # Walk backwards when the range is given newest-first
+    if end < start:
+        step = -step
     out, cur = [], start
-    while cur <= end:
-        out.append(cur)
+    while (cur <= end) if step > timedelta(0) else (cur >= end):
+        out.append(cur.isoformat(sep=" ", timespec="seconds"))
         cur += step
     return out
 
 
+def _write_pyexcelerate(header: list, table: list[list], widths: list[int]):
+    # Whole 2-D block handed over at once: no per-cell Python calls
+    wb = PyxWorkbook()
+    ws = wb.new_sheet("Procurement", data=[header] + table)
+    for j, w in enumerate(widths, 1):
+        ws.set_col_style(j, PyxStyle(size=w))
+    wb.save(OUTPUT_FILE)
+
+
+def _write_xlsxwriter(header: list, table: list[list], widths: list[int]):
+    # Streamed write: rows are flushed to disk as they go (flat memory)
+    wb = xlsxwriter.Workbook(
+        OUTPUT_FILE, {"constant_memory": True, "strings_to_urls": False}
+    )
+    ws = wb.add_worksheet("Procurement")
+    for j, w in enumerate(widths):
+        ws.set_column(j, j, w)
+
+    ws.write_row(0, 0, header)
+    for i, vals in enumerate(table, 1):
+        ws.write_row(i, 0, vals)
+    wb.close()
+
+
+def _write_openpyxl(header: list, table: list[list], widths: list[int]):
+    # Write-only mode streams rows; widths must be set before the first append
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Procurement")
+    for j, w in enumerate(widths):
+        ws.column_dimensions[get_column_letter(j + 1)].width = w
+
+    ws.append(header)
+    for vals in table:
+        ws.append(vals)
+    wb.save(OUTPUT_FILE)
+
+
 def write_excel(results: dict[str, dict]):
     if not results:
         print("No data fetched. Nothing to write.")
@@ -99,41 +238,44 @@ def write_excel(results: dict[str, dict]):
     ordered_ts = sorted(results.keys())
     rows = [results[ts] for ts in ordered_ts]
 
-    # Header union in first-seen order
-    header = list(rows[0].keys())
-    seen = set(header)
-    for r in rows[1:]:
-        for k in r.keys():
-            if k not in seen:
-                header.append(k)
-                seen.add(k)
+    # Header union in first-seen order (dicts keep insertion order)
+    header = list(dict.fromkeys(chain.from_iterable(rows)))
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Procurement"
+    # The API schema is fixed, so rows normally share the full header and can
+    # be laid out positionally; .get() is only needed for ragged rows
+    if all(len(r) == len(header) for r in rows):
+        get_row = itemgetter(*header)
+    else:
+        def get_row(rec):
+            return [rec.get(k) for k in header]
 
-    ws.append(header)
+    # Rows and column widths built in one pass (cells are never re-read)
+    table = []
+    widths = [len(h) for h in header]
     for rec in rows:
-        ws.append([rec.get(k) for k in header])
-
-    # Auto-fit columns (capped)
-    for col in ws.columns:
-        max_len = max(len(str(c.value)) if c.value is not None else 0 for c in col)
-        ws.column_dimensions[get_column_letter(col[0].column)].width = min(
-            max_len + 2, 60
-        )
+        vals = get_row(rec)
+        for j, v in enumerate(vals):
+            w = len(str(v)) if v is not None else 0
+            if w > widths[j]:
+                widths[j] = w
+        table.append(vals)
+    widths = [min(w + 2, 60) for w in widths]  # auto-fit (capped)
 
-    wb.save(OUTPUT_FILE)
+    if PyxWorkbook is not None:
+        _write_pyexcelerate(header, table, widths)
+    elif xlsxwriter is not None:
+        _write_xlsxwriter(header, table, widths)
+    else:
+        _write_openpyxl(header, table, widths)
     print(f"✅ Data saved to '{OUTPUT_FILE}'")
 
 
-def main():
-    timestamps = build_ts_list(START_DATE, END_DATE, TIME_STEP)
+def fetch_threaded(timestamps: list[str]):
     results: dict[str, dict] = {}
     errors: list[tuple[str, str]] = []
 
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
-        futures = {ex.submit(fetch_one, ts): ts for ts in timestamps}
+        futures = {ex.submit(fetch_one, ts_str): ts_str for ts_str in timestamps}
         for fut in tqdm(
             as_completed(futures),
             total=len(futures),
@@ -144,6 +286,48 @@ def main():
                 errors.append((ts_str, err))
             elif flat is not None:
                 results[ts_str] = flat
+    return results, errors
+
+
+async def fetch_async(timestamps: list[str]):
+    results: dict[str, dict] = {}
+    errors: list[tuple[str, str]] = []
+
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONCURRENCY, limit_per_host=MAX_CONCURRENCY
+    )
+    # At most MAX_CONCURRENCY requests hold a connection; the rest wait here,
+    # outside any request timeout
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tasks = [
+            asyncio.create_task(fetch_one_async(session, sem, ts_str))
+            for ts_str in timestamps
+        ]
+        for coro in tqdm(
+            asyncio.as_completed(tasks),
+            total=len(tasks),
+            desc="Fetching procurement blocks",
+        ):
+            ts_str, flat, err = await coro
+            if err:
+                errors.append((ts_str, err))
+            elif flat is not None:
+                results[ts_str] = flat
+    return results, errors
+
+
+def main():
+    timestamps = build_ts_list(START_DATE, END_DATE, TIME_STEP)
+    if not timestamps:
+        raise SystemExit(
+            f"❌ Empty timestamp range: {START_DATE} → {END_DATE} (step {TIME_STEP})"
+        )
+
+    if aiohttp is not None:
+        results, errors = asyncio.run(fetch_async(timestamps))
+    else:
+        results, errors = fetch_threaded(timestamps)
 
     write_excel(results)
 
@@ -1,7 +1,10 @@
 import os
-import io
+import re
 import gzip
+import mmap
+import shutil
 import sys
+import tempfile
 import requests
 from tqdm import tqdm
 from datetime import datetime
@@ -14,9 +17,9 @@ import mysql.connector as mysql
 # ────────────────────────────────────────────────────────────────────────────────
 
 
-def _open_sql_source(source: str) -> io.TextIOBase:
+def _open_sql_source(source: str):
     """
-    Open the SQL source and return a text stream (utf-8).
+    Open the SQL source and return its raw bytes (an mmap for local files).
     - HTTP/HTTPS URL
     - Local .sql or .sql.gz
     - Raw SQL string (heuristic: contains spaces/keywords and not a file path)
@@ -28,105 +31,222 @@ def _open_sql_source(source: str) -> io.TextIOBase:
         # auto-handle gzip if server returns gz
         raw = r.content
         if source.endswith(".gz"):
-            return io.TextIOWrapper(
-                io.BytesIO(gzip.decompress(raw)), encoding="utf-8", newline=""
-            )
-        return io.StringIO(r.text)
+            return gzip.decompress(raw)
+        return raw
 
     if os.path.isfile(source):
         print(f"📂 Reading SQL file: {source}")
         if source.endswith(".gz"):
-            return io.TextIOWrapper(
-                gzip.open(source, "rb"), encoding="utf-8", newline=""
-            )
-        return open(source, "r", encoding="utf-8", newline="")
+            # Inflate to a temp file so the dump is mapped, not held in RAM
+            f = tempfile.TemporaryFile()
+            with gzip.open(source, "rb") as gz:
+                shutil.copyfileobj(gz, f, 1024 * 1024)
+        else:
+            f = open(source, "rb")
+        with f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
     # Fallback: treat as raw SQL text
     print("📝 Using raw SQL string as source")
-    return io.StringIO(source)
+    return source.encode("utf-8")
+
+
+# Statement text up to the next comment, DELIMITER line or delimiter. Quoted
+# strings/identifiers are consumed whole, so nothing inside them can end a
+# statement, and a whole row-heavy INSERT is one regex match.
+_BODY_ALTERNATIVES = (
+    rb"'[^'\\]*(?:(?:\\.|'')[^'\\]*)*'"
+    rb'|"[^"\\]*(?:(?:\\.|"")[^"\\]*)*"'
+    rb"|`[^`]*(?:``[^`]*)*`"
+    rb"|/(?!\*)"
+    rb"|-(?!-(?:[ \t\r\n]|$))"
+    rb"|\n(?![ \t]*DELIMITER[ \t])"
+)
+_COMMENT_RE = re.compile(rb"/\*.*?\*/|--(?=[ \t\r\n]|$)[^\n]*|#[^\n]*", re.S | re.M)
+_DELIMITER_RE = re.compile(rb"\n?^[ \t]*DELIMITER[ \t]+(\S+)[^\n]*", re.M | re.I)
+_body_patterns: dict[bytes, re.Pattern] = {}
+
+
+def _body_pattern(delim: bytes) -> re.Pattern:
+    pattern = _body_patterns.get(delim)
+    if pattern is None:
+        first = re.escape(delim[:1])
+        plain = rb"[^'\"`/#\n\-" + first + rb"]+"
+        special = delim[:1] in b"'\"`/#\n-"  # starts like a quote/comment token
+        if len(delim) == 1 and not special:
+            # Nothing below can match the delimiter, so no lookahead is needed
+            body = rb"(?:" + plain + rb"|" + _BODY_ALTERNATIVES + rb")*"
+        else:
+            # Its first character may still appear on its own (e.g. "$" for "$$");
+            # "/", "-" etc. already have an alternative that respects comments
+            alternatives = _BODY_ALTERNATIVES
+            if not special:
+                alternatives += rb"|" + first
+            body = (
+                rb"(?:(?!" + re.escape(delim) + rb")(?:" + plain + rb"|"
+                + alternatives + rb"))*"
+            )
+        pattern = re.compile(body, re.M | re.I)
+        _body_patterns[delim] = pattern
+    return pattern
 
 
-def _sql_statement_stream(text_stream: io.TextIOBase):
+def _sql_statement_stream(buf):
     """
-    Generator that yields SQL statements respecting custom DELIMITER directives.
+    Generator that yields SQL statements (bytes) respecting custom DELIMITER directives.
     Handles:
       - DELIMITER changes (e.g., $$, //)
       - Single-line comments (-- ... , # ...)
       - Block comments /* ... */
     """
-    current_delim = ";"
-    buf = []
-    in_block_comment = False
-    delim_token = "DELIMITER "
-
-    for raw_line in text_stream:
-        line = raw_line
-
-        # Normalize line endings
-        if in_block_comment:
-            end_idx = line.find("*/")
-            if end_idx >= 0:
-                line = line[end_idx + 2 :]
-                in_block_comment = False
-            else:
-                continue
-
-        # Strip out block comments that start and end on same line
-        while "/*" in line:
-            start = line.find("/*")
-            end = line.find("*/", start + 2)
-            if end == -1:
-                # starts block comment; remainder discarded until we find end
-                line = line[:start]
-                in_block_comment = True
-                break
-            # remove inline block comment
-            line = line[:start] + line[end + 2 :]
-
-        if in_block_comment:
+    delim = b";"
+    body = _body_pattern(delim)
+    pieces = []  # statement text between stripped comments
+    pos, size = 0, len(buf)
+
+    while pos < size:
+        d = _DELIMITER_RE.match(buf, pos)
+        if d is not None:
+            # Handle DELIMITER command; flush any partial buffer
+            # (shouldn't happen if dump is well-formed)
+            partial = b"".join(pieces).strip()
+            if partial:
+                yield partial
+            pieces = []
+            # MySQL allows strange delimiters; trust dump
+            delim = d.group(1)
+            body = _body_pattern(delim)
+            pos = d.end()
             continue
 
-        # Trim leading/trailing whitespace for control checks
-        check = line.strip()
+        end = body.match(buf, pos).end()
+        pieces.append(buf[pos:end])
+        pos = end
+        if pos >= size:
+            break
+
+        c = _COMMENT_RE.match(buf, pos)
+        if c is not None:
+            # Strip comments
+            pos = c.end()
+        elif buf.startswith(delim, pos):
+            # Hit the current delimiter: emit the statement
+            stmt = (pieces[0] if len(pieces) == 1 else b"".join(pieces)).strip()
+            if stmt:
+                yield stmt
+            pieces = []
+            pos += len(delim)
+        elif _DELIMITER_RE.match(buf, pos) is None:
+            # Unterminated quote/comment or malformed DELIMITER: keep as text
+            pieces.append(buf[pos:pos + 1])
+            pos += 1
 
-        # Skip empty lines
-        if not check:
-            continue
+    # Flush any remaining statement
+    tail = b"".join(pieces).strip()
+    if tail:
+        yield tail
 
-        # Handle DELIMITER command
-        if check.upper().startswith("DELIMITER "):
-            # Flush any partial buffer (shouldn't happen if dump is well-formed)
-            if buf:
-                partial = "".join(buf).strip()
-                if partial:
-                    # Yield as-is without needing delimiter
-                    yield partial
-                buf = []
-            current_delim = check[len(delim_token) :].strip()
-            # MySQL allows strange delimiters; trust dump
+
+_INSERT_RE = re.compile(
+    rb"(INSERT(?:\s+IGNORE)?\s+INTO\s+([^\s(]+)\s*(?:\([^)]*\)\s*)?VALUES)\s*(\(.*\))",
+    re.I | re.S,
+)
+_ON_DUPLICATE_RE = re.compile(rb"\bON\s+DUPLICATE\s+KEY\b", re.I)
+
+# Engines that roll a failed multi-row INSERT back as a whole
+TRANSACTIONAL_ENGINES = {"innodb", "ndbcluster"}
+
+
+def _batch_inserts(stmts, max_bytes: int, can_merge):
+    """
+    Merge consecutive single-table INSERTs into multi-row INSERTs.
+    Yields (statement, source_statements); non-INSERTs pass through alone.
+    can_merge(table) is asked before each merged run; INSERTs into tables it
+    rejects (e.g. MyISAM, which keeps rows before a failing one) pass alone.
+    """
+    head, parts, values, size = None, [], [], 0
+    unmergeable = None  # head last rejected by can_merge; reset on any other statement
+
+    for stmt in stmts:
+        m = _INSERT_RE.fullmatch(stmt)
+        if m is None or _ON_DUPLICATE_RE.search(m.group(3)):
+            if parts:
+                yield _merge_insert(head, values, parts), parts
+                head, parts, values, size = None, [], [], 0
+            unmergeable = None
+            yield stmt, [stmt]
             continue
 
-        # Strip single-line comments
-        if check.startswith("--") or check.startswith("#"):
+        tuples = m.group(3)
+        if parts and (m.group(1) != head or size + len(tuples) > max_bytes):
+            yield _merge_insert(head, values, parts), parts
+            parts, values, size = [], [], 0
+        if not parts and (m.group(1) == unmergeable or not can_merge(m.group(2))):
+            unmergeable = m.group(1)
+            yield stmt, [stmt]
             continue
+        head = m.group(1)
+        parts.append(stmt)
+        values.append(tuples)
+        size += len(tuples) + 1
 
-        # Accumulate
-        buf.append(line)
+    if parts:
+        yield _merge_insert(head, values, parts), parts
 
-        # If the buffer ends with current_delim (ignoring trailing whitespace), emit
-        joined = "".join(buf)
-        # Work on a copy to test ending
-        test = joined.rstrip()
-        if current_delim and test.endswith(current_delim):
-            stmt = test[: -len(current_delim)].strip()
-            if stmt:
-                yield stmt
-            buf = []  # reset
 
-    # Flush any remaining statement
-    tail = "".join(buf).strip()
-    if tail:
-        yield tail
+def _merge_insert(head: bytes, values: list[bytes], parts: list[bytes]) -> bytes:
+    if len(parts) == 1:
+        return parts[0]
+    return head + b" " + b",".join(values)
+
+
+# Server settings relaxed for the import: (scope, variable, value).
+# sql_log_bin needs SUPER/SYSTEM_VARIABLES_ADMIN and innodb_flush_log_at_trx_commit
+# is global-only, so each is best-effort and restored afterwards. GLOBAL entries
+# affect every client on the server and are only applied with relax_durability.
+IMPORT_SETTINGS = [
+    ("SESSION", "unique_checks", 0),
+    ("SESSION", "sql_log_bin", 0),
+    ("GLOBAL", "innodb_flush_log_at_trx_commit", 2),
+]
+
+
+def _relax_import_settings(cur, include_global: bool = False) -> list[str]:
+    """Apply IMPORT_SETTINGS; return the statements that restore the old values."""
+    restore = []
+    for scope, name, value in IMPORT_SETTINGS:
+        if scope == "GLOBAL" and not include_global:
+            continue
+        try:
+            cur.execute(f"SELECT @@{scope}.{name};")
+            old = cur.fetchone()[0]
+            cur.execute(f"SET {scope} {name}={value};")
+            restore.append(f"SET {scope} {name}={old};")
+        except mysql.Error as e:
+            print(f"⚠️  Could not set {name}={value}: {e}")
+    return restore
+
+
+def _is_transactional(cur, table: bytes) -> bool:
+    """True if the (possibly db-qualified, backticked) table uses a transactional engine."""
+    schema, _, name = table.decode("utf-8", "replace").replace("`", "").rpartition(".")
+    cur.execute(
+        "SELECT ENGINE FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = COALESCE(NULLIF(%s, ''), DATABASE()) AND TABLE_NAME = %s;",
+        (schema, name),
+    )
+    row = cur.fetchone()
+    return row is not None and (row[0] or "").lower() in TRANSACTIONAL_ENGINES
+
+
+def _try_execute(cur, stmt: bytes):
+    try:
+        cur.execute(stmt)
+        return None
+    except mysql.Error as e:
+        return e
 
 
 def migrate_sql_to_mysql(
@@ -136,8 +256,9 @@ def migrate_sql_to_mysql(
     password: str = "",
     database: str | None = None,
     port: int = 3306,
-    commit_every: int = 200,  # commit after N statements
+    commit_every: int = 2000,  # commit after N statements
     stop_on_error: bool = False,  # if False, continue on errors
+    relax_durability: bool = False,  # server-wide redo-log flush relaxation
 ):
     """
     Import SQL into a MySQL database.
@@ -147,55 +268,90 @@ def migrate_sql_to_mysql(
         host, user, password, database, port: MySQL connection info
         commit_every: commit periodically
         stop_on_error: stop on first error or continue
+        relax_durability: also set GLOBAL innodb_flush_log_at_trx_commit=2
+            for the import (affects all clients until restored)
     """
     started = datetime.now()
     print(f"🚀 Starting import at {started:%Y-%m-%d %H:%M:%S}")
 
+    # Open the source first: nothing on the server is touched if this fails
+    buf = _open_sql_source(source)
+
     # Connect
     print(f"🔌 Connecting to MySQL at {host}:{port} ...")
-    conn = mysql.connect(
-        host=host,
-        user=user,
-        password=password,
-        database=database,
-        port=port,
-        autocommit=False,
-        charset="utf8mb4",
-        use_pure=True,
-    )
+    try:
+        conn = mysql.connect(
+            host=host,
+            user=user,
+            password=password,
+            database=database,
+            port=port,
+            autocommit=False,
+            charset="utf8mb4",
+            use_pure=False,  # C extension when available
+        )
+    except BaseException:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+        raise
     cur = conn.cursor()
-
-    # Safety: disable foreign key checks for duration of import
-    print("🧩 Disabling foreign key checks...")
-    cur.execute("SET FOREIGN_KEY_CHECKS=0;")
-    conn.commit()
-
-    # Some dumps rely on ANSI or NO_BACKSLASH_ESCAPES; you can adjust if needed:
-    # cur.execute("SET sql_mode='NO_AUTO_VALUE_ON_ZERO';")
-
-    stream = _open_sql_source(source)
-    stmt_iter = _sql_statement_stream(stream)
+    meta_cur = conn.cursor()  # engine lookups between statements
 
     applied = 0
     failed = 0
     pbar = tqdm(unit="stmt", desc="Executing", total=None)
     batch = 0
+    restore_settings = []
 
     try:
-        for stmt in stmt_iter:
+        # Merged INSERTs are kept safely below the server's packet limit
+        cur.execute("SELECT @@max_allowed_packet;")
+        max_insert_bytes = int(cur.fetchone()[0] * 0.8)
+
+        # Safety: disable foreign key checks for duration of import
+        print("🧩 Disabling foreign key checks...")
+        cur.execute("SET FOREIGN_KEY_CHECKS=0;")
+        conn.commit()
+
+        # Skip unique-index checks, binlog writes and (opt-in) redo-log fsyncs
+        print("🧩 Relaxing unique checks, binlog and redo-log flushing...")
+        restore_settings = _relax_import_settings(cur, relax_durability)
+
+        # Some dumps rely on ANSI or NO_BACKSLASH_ESCAPES; you can adjust if needed:
+        # cur.execute("SET sql_mode='NO_AUTO_VALUE_ON_ZERO';")
+
+        stmt_iter = _batch_inserts(
+            _sql_statement_stream(buf),
+            max_insert_bytes,
+            lambda table: _is_transactional(meta_cur, table),
+        )
+
+        for stmt, parts in stmt_iter:
             try:
                 cur.execute(stmt)
-                applied += 1
-                batch += 1
+                errors = [None] * len(parts)
             except mysql.Error as e:
-                failed += 1
-                print(
-                    f"\n❌ Error #{failed} at statement #{applied + failed}: {e}\n─── Statement ───\n{stmt[:1000]}\n───────────────"
-                )
-                if stop_on_error:
-                    raise
-
-            pbar.update(1)
+                if len(parts) == 1:
+                    errors = [e]
+                else:
+                    # Only transactional tables are merged, so the failed
+                    # multi-row INSERT left nothing behind; replay its source
+                    # statements to isolate the bad rows
+                    errors = [_try_execute(cur, part) for part in parts]
+
+            for part, err in zip(parts, errors):
+                if err is None:
+                    applied += 1
+                    batch += 1
+                else:
+                    failed += 1
+                    print(
+                        f"\n❌ Error #{failed} at statement #{applied + failed}: {err}\n─── Statement ───\n{part[:1000].decode('utf-8', 'replace')}\n───────────────"
+                    )
+                    if stop_on_error:
+                        raise err
+
+            pbar.update(len(parts))
             # periodic commit
             if batch >= commit_every:
                 conn.commit()
@@ -214,9 +370,16 @@ def migrate_sql_to_mysql(
             conn.commit()
         except Exception:
             pass
+        for restore in restore_settings:
+            try:
+                cur.execute(restore)
+            except Exception:
+                pass
+        meta_cur.close()
         cur.close()
         conn.close()
-        stream.close()
+        if isinstance(buf, mmap.mmap):
+            buf.close()
 
     ended = datetime.now()
     print(f"✅ Import DONE at {ended:%Y-%m-%d %H:%M:%S} (took {ended - started}).")
@@ -241,7 +404,7 @@ if __name__ == "__main__":
     }
 
     # Behaviour
-    COMMIT_EVERY = 200
+    COMMIT_EVERY = 2000
     STOP_ON_ERROR = False
 
     migrate_sql_to_mysql(
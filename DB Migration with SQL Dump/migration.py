@@ -1,10 +1,109 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 import pandas as pd
 from tqdm import tqdm
+import io
 import os
 import requests
 from datetime import datetime
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pac
+except ImportError:
+    pa = None
+
+
+# Column types for the banking CSV
+NUMERIC_COLUMNS = [
+    'Injection_Electricity', 'Total_Consumption', 'Net_Injection',
+    'Banking_Unit', 'Banking_Cumulative', 'Adjusted_Unit',
+    'MOD_Price', 'Banking_Charges', 'Adjustment_Charges'
+]
+
+
+def _text_columns(source, delimiter):
+    """Header columns other than TimeStamp/NUMERIC_COLUMNS; these are kept as text."""
+    names = pd.read_csv(source, delimiter=delimiter, quotechar='"', nrows=0).columns
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    typed = {'TimeStamp', *NUMERIC_COLUMNS}
+    return [col for col in names if col.strip('"') not in typed]
+
+
+def _read_csv_typed(source, delimiter, text_columns):
+    """
+    Parse the CSV straight into typed columns: a pyarrow Table when pyarrow is
+    installed, else a DataFrame from pandas' C engine with pinned dtypes.
+    Returns None when a value doesn't fit its column type.
+    """
+    if pa is not None:
+        # Nothing is inferred: dates/times/bytes in other columns would not be BSON-encodable
+        column_types = {col: pa.string() for col in text_columns}
+        column_types['TimeStamp'] = pa.timestamp('us')
+        column_types.update({col: pa.float64() for col in NUMERIC_COLUMNS})
+        try:
+            table = pac.read_csv(
+                source,
+                parse_options=pac.ParseOptions(delimiter=delimiter, quote_char='"'),
+                convert_options=pac.ConvertOptions(
+                    column_types=column_types, strings_can_be_null=True
+                ),
+            )
+        except pa.ArrowInvalid:
+            return None
+        # Clean column names (remove quotes if present)
+        return table.rename_columns([col.strip('"') for col in table.column_names])
+
+    dtype = {col: str for col in text_columns}
+    dtype.update({col: 'float64' for col in NUMERIC_COLUMNS})
+    try:
+        return pd.read_csv(
+            source, delimiter=delimiter, quotechar='"', engine='c',
+            dtype=dtype, parse_dates=['TimeStamp'], low_memory=False,
+        )
+    except ValueError:
+        return None
+
+
+def _load_csv(source, delimiter):
+    """
+    Load the CSV with typed parsing; if a value doesn't fit, re-read it once
+    untyped and coerce bad numbers to missing. Other columns stay text.
+    """
+    text_columns = _text_columns(source, delimiter)
+    df = _read_csv_typed(source, delimiter, text_columns)
+    if df is not None and not isinstance(df, pd.DataFrame):
+        return df  # pyarrow Table, already typed
+
+    if df is None:
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        df = pd.read_csv(source, delimiter=delimiter, quotechar='"',
+                         dtype={col: str for col in text_columns})
+    
+    # Clean column names (remove quotes if present)
+    df.columns = [col.strip('"') for col in df.columns]
+    
+    # Convert TimeStamp to datetime (no-op when parsed at load time)
+    if not pd.api.types.is_datetime64_any_dtype(df['TimeStamp']):
+        print("🕒 Converting timestamps...")
+        df['TimeStamp'] = pd.to_datetime(df['TimeStamp'])
+    
+    # Convert numeric columns to appropriate types
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns and not pd.api.types.is_float_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def _slice_records(data, start, size):
+    """Convert one slice of a Table/DataFrame to a list of dicts."""
+    if isinstance(data, pd.DataFrame):
+        batch = data.iloc[start:start+size]
+        # Missing values as None (stored as null), same as the pyarrow path
+        return batch.astype(object).where(batch.notna(), None).to_dict('records')
+    return data.slice(start, size).to_pylist()
+
 
 def migrate_csv_to_mongodb(csv_path, mongo_uri, db_name, collection_name, delimiter=';'):
     """
@@ -27,32 +126,11 @@ def migrate_csv_to_mongodb(csv_path, mongo_uri, db_name, collection_name, delimi
         print(f"🌐 Downloading CSV from {csv_path}...")
         resp = requests.get(csv_path)
         resp.raise_for_status()
-        df = pd.read_csv(pd.io.common.StringIO(resp.text), delimiter=delimiter, quotechar='"')
+        # Decode as requests does (header/detected charset), then hand UTF-8 to the parser
+        data = _load_csv(io.BytesIO(resp.text.encode('utf-8')), delimiter)
     else:
         print(f"📂 Reading CSV file from {csv_path}...")
-        df = pd.read_csv(csv_path, delimiter=delimiter, quotechar='"')
-    
-    # Clean column names (remove quotes if present)
-    df.columns = [col.strip('"') for col in df.columns]
-    
-    # Convert TimeStamp to datetime
-    print("🕒 Converting timestamps...")
-    df['TimeStamp'] = pd.to_datetime(df['TimeStamp'])
-    
-    # Convert numeric columns to appropriate types
-    numeric_columns = [
-        'Injection_Electricity', 'Total_Consumption', 'Net_Injection',
-        'Banking_Unit', 'Banking_Cumulative', 'Adjusted_Unit',
-        'MOD_Price', 'Banking_Charges', 'Adjustment_Charges'
-    ]
-    
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # Convert DataFrame to list of dictionaries
-    print("🔄 Preparing data for MongoDB...")
-    records = df.to_dict('records')
+        data = _load_csv(csv_path, delimiter)
     
     # Check if collection exists and has data
     existing_count = collection.count_documents({})
@@ -67,25 +145,25 @@ def migrate_csv_to_mongodb(csv_path, mongo_uri, db_name, collection_name, delimi
             print(f"🗑️  Dropping existing collection '{collection_name}'...")
             collection.drop()
     
+    # Create index on TimeStamp first so upserts don't scan the collection
+    print("🔍 Creating index on TimeStamp field...")
+    collection.create_index("TimeStamp")
+    
     # Insert data into MongoDB
-    print(f"📥 Inserting {len(records)} records into {db_name}.{collection_name}...")
+    print(f"📥 Inserting {len(data)} records into {db_name}.{collection_name}...")
     
     # Process in batches for better performance
     batch_size = 1000
-    for i in tqdm(range(0, len(records), batch_size), desc="Inserting batches", unit="batch"):
-        batch = records[i:i+batch_size]
+    for i in tqdm(range(0, len(data), batch_size), desc="Inserting batches", unit="batch"):
+        # Convert one slice at a time instead of the whole table up front
+        batch = _slice_records(data, i, batch_size)
         
-        # Upsert records (update if exists, insert if not)
-        for record in batch:
-            collection.update_one(
-                {"TimeStamp": record["TimeStamp"]},
-                {"$set": record},
-                upsert=True
-            )
-    
-    # Create index on TimeStamp for better query performance
-    print("🔍 Creating index on TimeStamp field...")
-    collection.create_index("TimeStamp")
+        # Upsert records (update if exists, insert if not), one round-trip per batch
+        ops = [
+            UpdateOne({"TimeStamp": record["TimeStamp"]}, {"$set": record}, upsert=True)
+            for record in batch
+        ]
+        collection.bulk_write(ops, ordered=False)
     
     # Verify the import
     final_count = collection.count_documents({})
@@ -113,29 +191,7 @@ def migrate_csv_from_string(csv_content, mongo_uri, db_name, collection_name, de
     
     # Load CSV data from string
     print("📄 Processing CSV content...")
-    df = pd.read_csv(pd.io.common.StringIO(csv_content), delimiter=delimiter, quotechar='"')
-    
-    # Clean column names (remove quotes if present)
-    df.columns = [col.strip('"') for col in df.columns]
-    
-    # Convert TimeStamp to datetime
-    print("🕒 Converting timestamps...")
-    df['TimeStamp'] = pd.to_datetime(df['TimeStamp'])
-    
-    # Convert numeric columns to appropriate types
-    numeric_columns = [
-        'Injection_Electricity', 'Total_Consumption', 'Net_Injection',
-        'Banking_Unit', 'Banking_Cumulative', 'Adjusted_Unit',
-        'MOD_Price', 'Banking_Charges', 'Adjustment_Charges'
-    ]
-    
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # Convert DataFrame to list of dictionaries
-    print("🔄 Preparing data for MongoDB...")
-    records = df.to_dict('records')
+    data = _load_csv(io.BytesIO(csv_content.encode('utf-8')), delimiter)
     
     # Check if collection exists and has data
     existing_count = collection.count_documents({})
@@ -150,25 +206,25 @@ def migrate_csv_from_string(csv_content, mongo_uri, db_name, collection_name, de
             print(f"🗑️  Dropping existing collection '{collection_name}'...")
             collection.drop()
     
+    # Create index on TimeStamp first so upserts don't scan the collection
+    print("🔍 Creating index on TimeStamp field...")
+    collection.create_index("TimeStamp")
+    
     # Insert data into MongoDB
-    print(f"📥 Inserting {len(records)} records into {db_name}.{collection_name}...")
+    print(f"📥 Inserting {len(data)} records into {db_name}.{collection_name}...")
     
     # Process in batches for better performance
     batch_size = 1000
-    for i in tqdm(range(0, len(records), batch_size), desc="Inserting batches", unit="batch"):
-        batch = records[i:i+batch_size]
+    for i in tqdm(range(0, len(data), batch_size), desc="Inserting batches", unit="batch"):
+        # Convert one slice at a time instead of the whole table up front
+        batch = _slice_records(data, i, batch_size)
         
-        # Upsert records (update if exists, insert if not)
-        for record in batch:
-            collection.update_one(
-                {"TimeStamp": record["TimeStamp"]},
-                {"$set": record},
-                upsert=True
-            )
-    
-    # Create index on TimeStamp for better query performance
-    print("🔍 Creating index on TimeStamp field...")
-    collection.create_index("TimeStamp")
+        # Upsert records (update if exists, insert if not), one round-trip per batch
+        ops = [
+            UpdateOne({"TimeStamp": record["TimeStamp"]}, {"$set": record}, upsert=True)
+            for record in batch
+        ]
+        collection.bulk_write(ops, ordered=False)
     
     # Verify the import
     final_count = collection.count_documents({})
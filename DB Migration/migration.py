@@ -1,9 +1,37 @@
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import create_engine, inspect, text
 from pymongo import MongoClient
 import pandas as pd
 from tqdm import tqdm
 from urllib.parse import urlparse
 
+READ_CHUNK_ROWS = 50_000   # rows fetched from the source per round
+INSERT_CHUNK_ROWS = 10_000  # max rows per multi-row INSERT on the destination
+PACKET_FILL = 0.8  # share of the destination's max_allowed_packet one INSERT may use
+
+# Per-row checks skipped on the destination session while a table is loaded
+RELAX_CHECKS = "SET SESSION unique_checks=0, foreign_key_checks=0"
+RESTORE_CHECKS = "SET SESSION unique_checks=1, foreign_key_checks=1"
+
+
+def _cell_bytes(value) -> int:
+    """Worst-case size of one value in a rendered INSERT."""
+    if isinstance(value, str):
+        return 3 * len(value) + 2  # up to 3 UTF-8 bytes per char, plus quotes
+    if isinstance(value, (bytes, bytearray)):
+        return 2 * len(value) + 10  # every byte escaped, plus _binary'...'
+    return 32  # numbers, dates, NULL
+
+
+def _insert_rows(chunk, max_bytes: int) -> int:
+    """Rows per multi-row INSERT so the widest row in the chunk keeps it under max_bytes."""
+    row_bytes = 3  # "(", ")" and ","
+    for _, col in chunk.items():
+        if col.dtype == object or pd.api.types.is_string_dtype(col):
+            row_bytes += max(map(_cell_bytes, col), default=0) + 1
+        else:
+            row_bytes += 33
+    return max(1, min(INSERT_CHUNK_ROWS, max_bytes // row_bytes))
+
 
 def migrate_mysql(source_uri, destination_uri):
     """Migrate all tables from one MySQL DB to another."""
@@ -19,14 +47,32 @@ def migrate_mysql(source_uri, destination_uri):
 
     print(f"📋  Found {len(tables)} MySQL table(s): {', '.join(tables)}")
 
+    # Multi-row INSERTs must fit in one packet on the destination
+    with dest_engine.connect() as conn:
+        max_packet = conn.execute(text("SELECT @@max_allowed_packet")).scalar()
+    max_insert_bytes = int(max_packet * PACKET_FILL)
+
     for table in tqdm(tables, desc="Migrating MySQL Tables", unit="table"):
         print(f"\nMigrating table: {table}")
         query = f"SELECT * FROM `{table}`"
 
         try:
-            df = pd.read_sql(query, source_engine)
-            with dest_engine.begin() as conn:
-                df.to_sql(table, conn, if_exists='replace', index=False)
+            # Column types come from the source, not from whatever the first chunk holds
+            dtype = {c["name"]: c["type"] for c in inspector.get_columns(table)}
+            # Stream the source in chunks (server-side cursor) so memory stays flat
+            with source_engine.connect().execution_options(stream_results=True) as src, \
+                    dest_engine.begin() as conn:
+                conn.execute(text(RELAX_CHECKS))
+                try:
+                    if_exists = 'replace'
+                    for chunk in pd.read_sql(query, src, chunksize=READ_CHUNK_ROWS):
+                        chunk.to_sql(table, conn, if_exists=if_exists, index=False,
+                                     dtype=dtype, method='multi',
+                                     chunksize=_insert_rows(chunk, max_insert_bytes))
+                        if_exists = 'append'
+                finally:
+                    # Pooled connection is reused for the next table
+                    conn.execute(text(RESTORE_CHECKS))
             print(f"   ✅ Table {table} migrated successfully.")
         except Exception as e:
             print(f"   ❌ Error migrating table {table}: {e}")
@@ -1,7 +1,7 @@
 # wi_excel_to_mongo.py
 import sys
 import pandas as pd
-from pymongo import MongoClient, ASCENDING, UpdateOne
+from pymongo import MongoClient, ASCENDING, UpdateOne, WriteConcern
 
 # ==== CONFIG ====
 EXCEL_PATH = r"C:\Users\hp\Desktop\Code\Tools\DB Upload in MongoDB with csv file\WI_with_pred.xlsx"  # <-- change to your file path
@@ -13,6 +13,7 @@ MONGO_COL = "mustrunplantconsumption"
 
 PLANT_NAME = "WI"
 BULK_BATCH = 2000
+LOAD_WRITE_CONCERN = WriteConcern(w=1, j=False)  # primary ack, no journal wait
 # =================
 
 TS_CANDIDATES = ["TimeStamp", "Timestamp", "Date", "date"]
@@ -20,38 +21,56 @@ ACT_CANDIDATES = ["Actual", "actual", "Actual_Value"]
 PRED_CANDIDATES = ["Pred", "Predicted", "Prediction", "pred", "forecast", "Pred_Value"]
 
 
-def pick(cols, candidates):
-    lower = {c.lower(): c for c in cols}
+def column_lookup(cols):
+    """Exact and lower-cased name maps for pick(); build once per column set."""
+    return set(cols), {c.lower(): c for c in cols}
+
+
+def pick(lookup, candidates):
+    exact, lower = lookup
     for cand in candidates:
-        if cand in cols:
+        if cand in exact:
             return cand
-        if cand.lower() in lower:
-            return lower[cand.lower()]
+        folded = cand.lower()
+        if folded in lower:
+            return lower[folded]
     return None
 
 
 def main():
-    # Read Excel
+    # Read just the header row to resolve column names
     try:
-        df = pd.read_excel(EXCEL_PATH, sheet_name=SHEET_NAME)
+        cols = list(pd.read_excel(EXCEL_PATH, sheet_name=SHEET_NAME, nrows=0).columns)
     except Exception as e:
         print(f"❌ Failed to read Excel: {e}")
         sys.exit(1)
 
-    if df.empty:
-        print("⚠️ Excel has no rows.")
-        return
-
     # Pick columns
-    cols = list(df.columns)
-    ts_col = pick(cols, TS_CANDIDATES)
-    act_col = pick(cols, ACT_CANDIDATES)
-    pred_col = pick(cols, PRED_CANDIDATES)
+    lookup = column_lookup(cols)
+    ts_col = pick(lookup, TS_CANDIDATES)
+    act_col = pick(lookup, ACT_CANDIDATES)
+    pred_col = pick(lookup, PRED_CANDIDATES)
 
     if not all([ts_col, act_col, pred_col]):
         print(f"❌ Missing required columns. Found: {cols}")
         return
 
+    # Read Excel, parsing only the three columns used below
+    try:
+        df = pd.read_excel(
+            EXCEL_PATH,
+            sheet_name=SHEET_NAME,
+            engine="openpyxl",
+            usecols=[ts_col, act_col, pred_col],
+        )
+    except Exception as e:
+        print(f"❌ Failed to read Excel: {e}")
+        sys.exit(1)
+
+    if df.empty:
+        print("⚠️ Excel has no rows.")
+        return
+
     df = df[[ts_col, act_col, pred_col]].copy()
     df.columns = ["TimeStamp", "Actual", "Pred"]
 
@@ -59,29 +78,51 @@ def main():
     df["TimeStamp"] = pd.to_datetime(df["TimeStamp"], errors="coerce", dayfirst=False)
     df = df.dropna(subset=["TimeStamp"])  # remove invalid timestamps
 
-    # Convert to Python datetime (so Mongo stores it as ISODate, not string)
-    df["TimeStamp"] = df["TimeStamp"].dt.to_pydatetime()
-
     # Ensure numeric values
     df["Actual"] = pd.to_numeric(df["Actual"], errors="coerce")
     df["Pred"] = pd.to_numeric(df["Pred"], errors="coerce")
 
-    # Add Plant_Name
-    df["Plant_Name"] = PLANT_NAME
-
     # Connect to MongoDB
     client = MongoClient(MONGO_URI)
     col = client[MONGO_DB][MONGO_COL]
-    col.create_index([("TimeStamp", ASCENDING), ("Plant_Name", ASCENDING)], unique=True)
+    index_keys = [("TimeStamp", ASCENDING), ("Plant_Name", ASCENDING)]
+    index_name = "TimeStamp_1_Plant_Name_1"
+    fresh = col.estimated_document_count() == 0
+    if fresh:
+        # Initial load: plain inserts without the unique index, build it once after.
+        # Last row wins on duplicate timestamps, same as the upsert path.
+        if index_name in col.index_information():
+            col.drop_index(index_name)
+        df = df.drop_duplicates(subset="TimeStamp", keep="last")
+    else:
+        col.create_index(index_keys, unique=True)
+    col = col.with_options(write_concern=LOAD_WRITE_CONCERN)
+
+    # TimeStamp as Python datetime so Mongo stores it as ISODate, not string.
+    ts = df["TimeStamp"].dt.to_pydatetime().tolist()
+    act = df["Actual"].to_numpy().tolist()
+    pred = df["Pred"].to_numpy().tolist()
+
+    if fresh:
+        docs = [
+            {"TimeStamp": t, "Actual": a, "Pred": p, "Plant_Name": PLANT_NAME}
+            for t, a, p in zip(ts, act, pred)
+        ]
+        for i in range(0, len(docs), BULK_BATCH):
+            col.insert_many(docs[i : i + BULK_BATCH], ordered=False)
+        col.create_index(index_keys, unique=True)
+        print(
+            f"✅ Done. Inserted {len(docs)} docs into {MONGO_DB}.{MONGO_COL} for Plant_Name='{PLANT_NAME}'."
+        )
+        return
 
-    # Bulk upsert
-    records = df.to_dict("records")
+    # Incremental run: bulk upsert straight from the columns (no per-row dict from pandas)
     ops = []
-    for r in records:
+    for t, a, p in zip(ts, act, pred):
         ops.append(
             UpdateOne(
-                {"TimeStamp": r["TimeStamp"], "Plant_Name": r["Plant_Name"]},
-                {"$set": r},
+                {"TimeStamp": t, "Plant_Name": PLANT_NAME},
+                {"$set": {"TimeStamp": t, "Actual": a, "Pred": p, "Plant_Name": PLANT_NAME}},
                 upsert=True,
             )
         )
@@ -92,7 +133,7 @@ def main():
         col.bulk_write(ops, ordered=False)
 
     print(
-        f"✅ Done. Upserted {len(records)} docs into {MONGO_DB}.{MONGO_COL} for Plant_Name='{PLANT_NAME}'."
+        f"✅ Done. Upserted {len(ts)} docs into {MONGO_DB}.{MONGO_COL} for Plant_Name='{PLANT_NAME}'."
     )
 
 
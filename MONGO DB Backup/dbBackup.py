@@ -7,9 +7,17 @@ Dump every table/collection of a database to individual CSV files.
 • Run:  python backup_db_as_csv.py
 """
 
+import codecs
+import csv
+import json
+import os
+import shutil
+import subprocess
+import tempfile
 from pathlib import Path
 from datetime import datetime
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import pandas as pd
 from sqlalchemy import create_engine, inspect
@@ -20,6 +28,12 @@ try:
 except ImportError:
     print("⚠️  Missing pymongo. Run: pip install pymongo")
 
+# Opt-in native exporter (MongoDB Database Tools 100.3+). Its CSV differs from
+# the pymongo path: dates as ISO-8601 "...Z" and nested values as extended JSON.
+USE_MONGOEXPORT = False
+MONGOEXPORT = shutil.which("mongoexport") if USE_MONGOEXPORT else None
+MAX_WORKERS = 4  # collections exported concurrently
+
 def export_mysql_to_csv(source_uri: str, out_dir: Path) -> None:
     """Backup MySQL database tables to CSV."""
     engine = create_engine(source_uri)
@@ -47,6 +61,73 @@ def export_mysql_to_csv(source_uri: str, out_dir: Path) -> None:
     print(f"🎉  MySQL Backup finished. Files are in: {out_dir.resolve()}")
 
 
+def _collection_fields(collection) -> list:
+    """Top-level field names: the first document's order, then any others."""
+    first = collection.find_one({}, projection={"_id": 0})
+    if first is None:
+        return []
+    header = list(first)
+    seen = set(header) | {"_id"}
+    pipeline = [
+        {"$project": {"kv": {"$objectToArray": "$$ROOT"}}},
+        {"$unwind": "$kv"},
+        {"$group": {"_id": "$kv.k"}},
+    ]
+    others = {doc["_id"] for doc in collection.aggregate(pipeline)} - seen
+    return header + sorted(others)
+
+
+def _run_mongoexport(source_uri: str, name: str, header: list, csv_file: Path) -> None:
+    # The URI carries credentials: pass it in a private --config file, not argv
+    fd, config_path = tempfile.mkstemp(suffix=".yaml")
+    try:
+        with os.fdopen(fd, "w") as cfg:
+            cfg.write(f"uri: {json.dumps(source_uri)}\n")
+        cmd = [
+            MONGOEXPORT, f"--config={config_path}", "--collection", name,
+            "--type=csv", "--fields", ",".join(header), "--quiet",
+        ]
+        with open(csv_file, "wb") as fh:
+            fh.write(codecs.BOM_UTF8)  # same BOM as the other backups, for Excel
+            fh.flush()
+            proc = subprocess.run(cmd, stdout=fh, stderr=subprocess.PIPE, text=True)
+    finally:
+        os.remove(config_path)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip() or f"mongoexport exited {proc.returncode}")
+
+
+def _export_collection(source_uri: str, collection, out_dir: Path):
+    """Write one collection to `out_dir/<name>.csv`; None if it is empty."""
+    header = _collection_fields(collection)
+    if not header:
+        return None
+    csv_file = out_dir / f"{collection.name}.csv"
+    # Written under a .part name and renamed when complete, so a collection
+    # that fails halfway doesn't leave a truncated CSV behind
+    part_file = csv_file.with_name(csv_file.name + ".part")
+
+    try:
+        if MONGOEXPORT:
+            _run_mongoexport(source_uri, collection.name, header, part_file)
+        else:
+            # Stream documents straight to CSV; MongoDB's internal ID is dropped
+            # server-side
+            with open(part_file, "w", encoding="utf-8-sig", newline="") as fh, \
+                    collection.find({}, projection={"_id": 0}, batch_size=5000,
+                                    no_cursor_timeout=True) as cursor:
+                # Fields that appear after the header snapshot are left out rather
+                # than failing the whole collection
+                writer = csv.DictWriter(fh, fieldnames=header, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(cursor)
+    except BaseException:
+        part_file.unlink(missing_ok=True)
+        raise
+    part_file.replace(csv_file)
+    return csv_file
+
+
 def export_mongo_to_csv(source_uri: str, out_dir: Path) -> None:
     """Backup MongoDB collections to CSV."""
     parsed = urlparse(source_uri)
@@ -62,22 +143,28 @@ def export_mongo_to_csv(source_uri: str, out_dir: Path) -> None:
     print(f"📋  Found {len(collections)} MongoDB collection(s): {', '.join(collections)}")
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    for collection_name in tqdm(collections, desc="Exporting MongoDB", unit="collection"):
-        try:
-            collection = db[collection_name]
-            documents = list(collection.find())
-            if documents:
-                df = pd.DataFrame(documents)
-                # Drop MongoDB's internal ID if not needed
-                if '_id' in df.columns:
-                    df.drop(columns=['_id'], inplace=True)
-                csv_file = out_dir / f"{collection_name}.csv"
-                df.to_csv(csv_file, index=False, encoding="utf-8-sig")
-                tqdm.write(f"   ✅  {csv_file.name}")
-            else:
-                tqdm.write(f"   ⚠️  {collection_name} is empty. Skipped.")
-        except Exception as exc:
-            tqdm.write(f"   ❌  Skipped {collection_name}: {exc}")
+    if MONGOEXPORT:
+        print(f"🧰  Using {MONGOEXPORT}")
+    elif USE_MONGOEXPORT:
+        print("⚠️  mongoexport not found on PATH. Falling back to pymongo.")
+
+    # Collections are independent, so several are exported at once
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futures = {
+            ex.submit(_export_collection, source_uri, db[name], out_dir): name
+            for name in collections
+        }
+        for fut in tqdm(as_completed(futures), total=len(futures),
+                        desc="Exporting MongoDB", unit="collection"):
+            collection_name = futures[fut]
+            try:
+                csv_file = fut.result()
+                if csv_file is not None:
+                    tqdm.write(f"   ✅  {csv_file.name}")
+                else:
+                    tqdm.write(f"   ⚠️  {collection_name} is empty. Skipped.")
+            except Exception as exc:
+                tqdm.write(f"   ❌  Skipped {collection_name}: {exc}")
 
     client.close()
     print(f"🎉  MongoDB Backup finished. Files are in: {out_dir.resolve()}")
@@ -1,8 +1,11 @@
 # mustrunconsumption.py
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import mysql.connector
-from pymongo import MongoClient, ASCENDING
+from sqlalchemy import create_engine
+from sqlalchemy.engine import URL
+from pymongo import MongoClient, ASCENDING, UpdateOne, WriteConcern
 from tqdm import tqdm
 
 # ─── CONFIG ───────────────────────────────────────────────────────────
@@ -19,8 +22,14 @@ MONGO_DB = "powercasting"
 MONGO_COL = "mustrunplantconsumption"
 
 UPSERT = True  # upsert by (TimeStamp, Plant_Name)
-BATCH_INSERT = 1000  # not used for upserts; used if UPSERT=False
+BATCH_INSERT = 1000  # ops per bulk_write / insert_many round-trip
+READ_CHUNK = 50_000  # plant-table rows streamed from MySQL per chunk
 VERBOSE_SKIPS = True  # print reason when a plant is skipped
+MAX_WORKERS = 8  # plants migrated concurrently (one MySQL connection each)
+# Peak memory is about MAX_WORKERS * READ_CHUNK rows; lower either on small hosts
+# Bulk-load writes are acked by the primary without waiting for the journal;
+# the unique index still guards (TimeStamp, Plant_Name)
+LOAD_WRITE_CONCERN = WriteConcern(w=1, j=False)
 
 # Plant codes to skip
 SKIP_CODES = ["WI"]  # add more codes here if needed
@@ -32,21 +41,38 @@ ACT_CANDIDATES = ["Actual", "Actual_Value", "actual", "value", "act"]
 PRED_CANDIDATES = ["Pred", "Predicted", "Prediction", "Pred_Value", "pred", "forecast"]
 
 
-def _get_columns(conn, table: str) -> list[str]:
+def fetch_columns_by_table(conn, tables: list[str]) -> dict[str, list[str]]:
+    """Columns of every table in one information_schema round-trip (keys lower-cased)."""
+    if not tables:
+        return {}
+    placeholders = ", ".join(["%s"] * len(tables))
+    q = (
+        "SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS "
+        f"WHERE TABLE_SCHEMA = %s AND TABLE_NAME IN ({placeholders}) "
+        "ORDER BY TABLE_NAME, ORDINAL_POSITION;"
+    )
     cur = conn.cursor()
-    cur.execute(f"SHOW COLUMNS FROM `{table}`;")
-    cols = [r[0] for r in cur.fetchall()]
+    cur.execute(q, (MYSQL["database"], *tables))
+    cols_by_table: dict[str, list[str]] = {}
+    for table, col in cur.fetchall():
+        cols_by_table.setdefault(table.lower(), []).append(col)
     cur.close()
-    return cols
+    return cols_by_table
 
 
-def _pick(colnames: list[str], candidates: list[str]) -> str | None:
-    lower = {c.lower(): c for c in colnames}
+def _column_lookup(colnames: list[str]) -> tuple[set[str], dict[str, str]]:
+    """Exact and lower-cased name maps for _pick(); build once per table."""
+    return set(colnames), {c.lower(): c for c in colnames}
+
+
+def _pick(lookup: tuple[set[str], dict[str, str]], candidates: list[str]) -> str | None:
+    exact, lower = lookup
     for cand in candidates:
-        if cand in colnames:
+        if cand in exact:
             return cand
-        if cand.lower() in lower:
-            return lower[cand.lower()]
+        folded = cand.lower()
+        if folded in lower:
+            return lower[folded]
     return None
 
 
@@ -59,11 +85,30 @@ def fetch_must_run_codes(conn) -> list[str]:
     return codes
 
 
-def fetch_plant_df(conn, table: str) -> pd.DataFrame:
-    cols = _get_columns(conn, table)
-    ts = _pick(cols, TS_CANDIDATES)
-    act = _pick(cols, ACT_CANDIDATES)
-    pred = _pick(cols, PRED_CANDIDATES)
+def make_engine():
+    # PyMySQL: stream_results maps to its unbuffered SSCursor (the mysqlconnector
+    # dialect has no server-side cursors and would buffer whole tables)
+    url = URL.create(
+        "mysql+pymysql",
+        username=MYSQL["user"],
+        password=MYSQL["password"],
+        host=MYSQL["host"],
+        port=MYSQL["port"],
+        database=MYSQL["database"],
+    )
+    return create_engine(
+        url, pool_pre_ping=True, pool_size=MAX_WORKERS, max_overflow=0
+    )
+
+
+def fetch_plant_chunks(engine, table: str, cols: list[str] | None):
+    """Yield normalized (TimeStamp, Actual, Pred) DataFrames, READ_CHUNK rows at a time."""
+    if not cols:
+        raise RuntimeError("table not found")
+    lookup = _column_lookup(cols)
+    ts = _pick(lookup, TS_CANDIDATES)
+    act = _pick(lookup, ACT_CANDIDATES)
+    pred = _pick(lookup, PRED_CANDIDATES)
 
     missing = []
     if ts is None:
@@ -78,16 +123,48 @@ def fetch_plant_df(conn, table: str) -> pd.DataFrame:
 
     # Build a select that aliases to canonical names
     q = f"SELECT `{ts}` AS TimeStamp, `{act}` AS Actual, `{pred}` AS Pred FROM `{table}`;"
-    df = pd.read_sql(q, conn)
-
-    # Normalize dtypes
-    if not pd.api.types.is_datetime64_any_dtype(df["TimeStamp"]):
-        df["TimeStamp"] = pd.to_datetime(df["TimeStamp"], errors="coerce")
-    df["Actual"] = pd.to_numeric(df["Actual"], errors="coerce")
-    df["Pred"] = pd.to_numeric(df["Pred"], errors="coerce")
 
-    df = df.dropna(subset=["TimeStamp"])
-    return df
+    # Server-side cursor: large plant tables are streamed, not buffered
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for df in pd.read_sql(q, conn, chunksize=READ_CHUNK):
+            # Normalize dtypes
+            if not pd.api.types.is_datetime64_any_dtype(df["TimeStamp"]):
+                df["TimeStamp"] = pd.to_datetime(df["TimeStamp"], errors="coerce")
+            df["Actual"] = pd.to_numeric(df["Actual"], errors="coerce")
+            df["Pred"] = pd.to_numeric(df["Pred"], errors="coerce")
+
+            yield df.dropna(subset=["TimeStamp"])
+
+
+def write_records(col, records: list[dict]) -> None:
+    for i in range(0, len(records), BATCH_INSERT):
+        batch = records[i : i + BATCH_INSERT]
+        if UPSERT:
+            # Ops built per batch so only BATCH_INSERT of them exist at a time
+            ops = [
+                UpdateOne(
+                    {"TimeStamp": r["TimeStamp"], "Plant_Name": r["Plant_Name"]},
+                    {"$set": r},
+                    upsert=True,
+                )
+                for r in batch
+            ]
+            col.bulk_write(ops, ordered=False)
+        else:
+            col.insert_many(batch)
+
+
+def migrate_plant(engine, col, code: str, cols: list[str] | None) -> int:
+    """Copy one plant's rows into Mongo; returns the number of rows written."""
+    written = 0
+    for df in fetch_plant_chunks(engine, code, cols):
+        if df.empty:
+            continue
+        df["Plant_Name"] = code
+        records = df.to_dict("records")
+        write_records(col, records)
+        written += len(records)
+    return written
 
 
 def main():
@@ -97,21 +174,23 @@ def main():
     except mysql.connector.Error as e:
         print(f"❌ MySQL connection failed: {e}")
         sys.exit(1)
+    engine = make_engine()
 
     # Connect Mongo
     try:
-        mongo = MongoClient(MONGO_URI)
+        mongo = MongoClient(MONGO_URI, maxPoolSize=MAX_WORKERS * 2)
         mdb = mongo[MONGO_DB]
         col = mdb[MONGO_COL]
     except Exception as e:
         print(f"❌ MongoDB connection failed: {e}")
         sys.exit(1)
 
-    # Ensure unique index for upserts
-    if UPSERT:
+    # Ensure unique index for upserts (skip the build request if it exists)
+    if UPSERT and "TimeStamp_1_Plant_Name_1" not in col.index_information():
         col.create_index(
             [("TimeStamp", ASCENDING), ("Plant_Name", ASCENDING)], unique=True
         )
+    col = col.with_options(write_concern=LOAD_WRITE_CONCERN)
 
     print("🔍 Fetching must run plant codes...")
     codes = fetch_must_run_codes(sql_conn)
@@ -120,41 +199,39 @@ def main():
     codes = [c for c in codes if c not in SKIP_CODES]
     print(f"✅ Found {len(codes)} must run plants (excluding {SKIP_CODES}).")
 
+    # One metadata query for all plant tables instead of SHOW COLUMNS per plant
+    cols_by_table = fetch_columns_by_table(sql_conn, codes)
+
     total_written = 0
     skipped = 0
-    for code in tqdm(codes, desc="Processing plants"):
-        try:
-            df = fetch_plant_df(sql_conn, code)
-            if df.empty:
+    # Plants are independent MySQL → Mongo pipelines; threads overlap their
+    # I/O (both drivers release the GIL while waiting on the network)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futures = {
+            ex.submit(migrate_plant, engine, col, code, cols_by_table.get(code.lower())): code
+            for code in codes
+        }
+        for fut in tqdm(as_completed(futures), total=len(futures), desc="Processing plants"):
+            code = futures[fut]
+            try:
+                written = fut.result()
+            except Exception as e:
                 skipped += 1
                 if VERBOSE_SKIPS:
-                    print(f"\n⚠️  '{code}' has no rows after filtering; skipping.")
+                    print(f"\n⚠️  Skipping '{code}': {e}")
                 continue
 
-            df["Plant_Name"] = code
-            records = df.to_dict("records")
-
-            if UPSERT:
-                for r in records:
-                    col.update_one(
-                        {"TimeStamp": r["TimeStamp"], "Plant_Name": r["Plant_Name"]},
-                        {"$set": r},
-                        upsert=True,
-                    )
-                total_written += len(records)
-            else:
-                for i in range(0, len(records), BATCH_INSERT):
-                    col.insert_many(records[i : i + BATCH_INSERT])
-                total_written += len(records)
-
-        except Exception as e:
-            skipped += 1
-            if VERBOSE_SKIPS:
-                print(f"\n⚠️  Skipping '{code}': {e}")
+            if written == 0:
+                skipped += 1
+                if VERBOSE_SKIPS:
+                    print(f"\n⚠️  '{code}' has no rows after filtering; skipping.")
+                continue
+            total_written += written
 
     print(f"\n✅ Done. Upserted/Inserted: {total_written} | Skipped plants: {skipped}")
 
     sql_conn.close()
+    engine.dispose()
     mongo.close()
 
 
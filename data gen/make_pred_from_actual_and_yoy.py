@@ -45,6 +45,73 @@ def detect_cols(df):
     return date_col, actual_col
 
 
+def build_pred(ts, actual, pred, rng, pivot):
+    """
+    Vectorized equivalent of walking the rows forward in time.
+
+    ts must be sorted (NaT last); actual/pred are float arrays aligned with it.
+    One epsilon in [-5%, +5%] is drawn per non-NaT row, in row order, so a
+    given seed gives the same values as the row-by-row version.
+    """
+    n = len(ts)
+    pred = pred.copy()
+    valid = ts.notna().to_numpy()
+    factor = np.full(n, np.nan)
+    factor[valid] = 1.0 + rng.uniform(-0.05, 0.05, size=int(valid.sum()))
+
+    # Before the pivot: actual (non-zero historically) ±5%
+    before = valid & (ts < pivot).to_numpy()
+    pred[before] = actual[before] * factor[before]
+
+    # On/after the pivot: previous year's SAME timestamp pred.
+    # anchor_idx is the (last) row holding ts - 1 year, or -1 if none.
+    pos = pd.Series(np.arange(n), index=ts.to_numpy())
+    pos = pos[~pos.index.duplicated(keep="last")]
+    anchors = (ts - DateOffset(years=1)).to_numpy()
+    anchor_idx = pos.reindex(anchors).fillna(-1).to_numpy(dtype=np.int64)
+    actual_ok = ~np.isnan(actual) & (actual != 0.0)
+
+    # Anchors are always one year back, so each year after the pivot only
+    # depends on the years already filled in
+    remaining = valid & ~before
+    lo = pivot
+    while remaining.any():
+        hi = lo + DateOffset(years=1)
+        idx = np.flatnonzero(remaining & (ts < hi).to_numpy())
+        remaining[idx] = False
+        lo = hi
+        if idx.size == 0:
+            continue
+
+        j = anchor_idx[idx]
+        base = np.where(j >= 0, pred[j], np.nan)
+        use_anchor = ~np.isnan(base)
+        rows = idx[use_anchor]
+        pred[rows] = base[use_anchor] * factor[rows]
+
+        # Fallbacks (rare): if no anchor pred exists yet
+        # 1) If actual is non-zero, use it; else 2) use previous row pred; else NaN
+        use_actual = ~use_anchor & actual_ok[idx]
+        rows = idx[use_actual]
+        pred[rows] = actual[rows] * factor[rows]
+        _chain_previous(pred, factor, idx[~use_anchor & ~use_actual])
+
+    return pred
+
+
+def _chain_previous(pred, factor, rows):
+    """pred[i] = pred[i - 1] * factor[i] for each run of consecutive rows."""
+    if rows.size == 0:
+        return
+    run_starts = np.flatnonzero(np.r_[True, np.diff(rows) != 1])
+    for run in np.split(rows, run_starts[1:]):
+        first = run[0]
+        prev = pred[first - 1] if first > 0 else np.nan
+        vals = factor[run].copy()
+        vals[0] *= prev
+        pred[run] = np.multiply.accumulate(vals)
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("input_csv", help="Path to input CSV")
@@ -73,45 +140,14 @@ def main():
     if "pred" not in df.columns:
         df["pred"] = np.nan
 
-    # Build fast index: exact timestamp -> row index
-    ts_to_idx = {ts: i for i, ts in enumerate(df[date_col])}
-
     pivot = pd.Timestamp("2024-04-01 00:00:00")
-
-    # Walk forward chronologically so YoY anchors are already computed
-    for i in range(len(df)):
-        ts = df.at[i, date_col]
-        if pd.isna(ts):
-            continue
-
-        # draw one epsilon in [-5%, +5%] per row
-        eps = float(rng.uniform(-0.05, 0.05))
-
-        if ts < pivot:
-            # Use actual (non-zero historically) ±5%
-            a = df.at[i, actual_col]
-            if pd.isna(a):
-                df.at[i, "pred"] = np.nan
-            else:
-                df.at[i, "pred"] = float(a) * (1.0 + eps)
-        else:
-            # On/after 2024-04-01: build from previous year's SAME timestamp pred
-            anchor = ts - DateOffset(years=1)
-            j = ts_to_idx.get(anchor)
-
-            if j is not None and not pd.isna(df.at[j, "pred"]):
-                base = df.at[j, "pred"]
-                df.at[i, "pred"] = float(base) * (1.0 + eps)
-            else:
-                # Fallbacks (rare): if no anchor pred exists yet
-                # 1) If actual is non-zero, use it; else 2) use previous row pred; else NaN
-                a = df.at[i, actual_col]
-                if pd.notna(a) and float(a) != 0.0:
-                    df.at[i, "pred"] = float(a) * (1.0 + eps)
-                elif i > 0 and pd.notna(df.at[i - 1, "pred"]):
-                    df.at[i, "pred"] = float(df.at[i - 1, "pred"]) * (1.0 + eps)
-                else:
-                    df.at[i, "pred"] = np.nan
+    df["pred"] = build_pred(
+        df[date_col],
+        pd.to_numeric(df[actual_col], errors="coerce").to_numpy(dtype=float),
+        pd.to_numeric(df["pred"], errors="coerce").to_numpy(dtype=float),
+        rng,
+        pivot,
+    )
 
     # Save next to input
     inp = Path(args.input_csv)